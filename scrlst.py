@@ -1,17 +1,25 @@
+import io
+import re
 import os
 import sys
 import subprocess
 import importlib
-import requests
+import multiprocessing
+import json
+import time
 import math
 import shutil
 from pathlib import Path
+from typing import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
-from packaging.version import parse as parse_version
 from importlib.metadata import PackageNotFoundError, version as get_version
 
 # --- Настройки ---
 CHECK_VER = 1  # проверять версии пакетов на PyPI (0 = только импорт без проверки)
+PYPI_CACHE_FILE = Path.home() / ".scrlst_cache.json"  # кэш результатов проверки версий на PyPI
+PYPI_CACHE_TTL = 24 * 60 * 60  # как долго (в секундах) доверять кэшу, прежде чем снова идти на PyPI
+PYPI_FAIL_TTL = 60 * 60  # через сколько секунд повторять проверку, если прошлая не удалась
 VIDEO_EXTS = {".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".webm"}
 THUMBS_PER_ROW = 4
 THUMBS_PER_COL = 4
@@ -20,10 +28,15 @@ PADDING = 10
 HEADER_HEIGHT = 60
 FONT_SIZE = 20
 BG_COLOR = "black"
+JOBS = max(1, (os.cpu_count() or 2) // 2)  # сколько видео обрабатывать параллельно при пакетной обработке
+FFMPEG_BATCH_SIZE = 16  # сколько кадров извлекать одним вызовом ffmpeg (каждый кадр — отдельный вход в командной строке)
+FFMPEG_THREADS = 0  # потоков на каждый вызов ffmpeg/ffprobe (0 = на усмотрение ffmpeg, в параллельных процессах = 1)
 
 # Режим обработки существующих скринлистов:
 #   1  = всегда перезаписывать старый файл
-#   0  = создавать новый файл с индексом (_1, _2, ...) если имя занято
+#   0  = создавать новый файл с индексом (_1, _2, ...) если имя занято;
+#        индекс = наибольший существующий + 1 (пропуски не заполняются),
+#        скринлисты других видео вида имя_2019.jpg (от имя_2019.mp4) не учитываются
 #  -1  = если файл уже существует, пропускать этот видеофайл
 OVERWRITE = 0
 
@@ -43,13 +56,85 @@ for tool in ["ffmpeg", "ffprobe"]:
         sys.exit(1)
 
 # --- Универсальный импорт и автообновление внешних модулей ---
+def get_latest_version(pypi_name: str) -> str:
+    """
+    Возвращает последнюю версию пакета на PyPI.
+    Результат кэшируется в PYPI_CACHE_FILE на PYPI_CACHE_TTL секунд,
+    неудачная попытка — на PYPI_FAIL_TTL секунд.
+    """
+    try:
+        cache = json.loads(PYPI_CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cache = {}
+
+    entry = cache.get(pypi_name) or {}
+    if "latest" in entry and entry.get("checked", 0) + PYPI_CACHE_TTL > time.time():
+        return entry["latest"]
+    if entry.get("failed", 0) + PYPI_FAIL_TTL > time.time():
+        raise RuntimeError("прошлая проверка не удалась, следующая попытка позже")
+
+    try:
+        latest = fetch_latest_version(pypi_name)
+    except Exception:
+        entry["failed"] = time.time()
+        cache[pypi_name] = entry
+        save_pypi_cache(cache)
+        raise
+
+    cache[pypi_name] = {"checked": time.time(), "latest": latest}
+    save_pypi_cache(cache)
+    return latest
+
+def save_pypi_cache(cache: dict) -> None:
+    """Сохранить кэш проверок PyPI (ошибки записи игнорируются)."""
+    try:
+        PYPI_CACHE_FILE.write_text(json.dumps(cache), encoding="utf-8")
+    except OSError:
+        pass
+
+def fetch_latest_version(pypi_name: str) -> str:
+    """Запросить последнюю версию пакета с PyPI."""
+    # urllib.request тянет за собой http.client, ssl и email — импортируем только при походе в сеть
+    import ssl
+    import urllib.request
+    # Python с python.org под macOS не видит системные сертификаты, поэтому берём certifi, если он есть
+    try:
+        import certifi
+        context = ssl.create_default_context(cafile=certifi.where())
+    except ImportError:
+        context = ssl.create_default_context()
+    with urllib.request.urlopen(f"https://pypi.org/pypi/{pypi_name}/json", timeout=5, context=context) as resp:
+        return json.load(resp)["info"]["version"]
+
+def version_tuple(ver: str) -> tuple[int, ...] | None:
+    """Разобрать простую версию вида 1.2.3 в кортеж чисел (None для pre/post/dev и т.п.)."""
+    try:
+        return tuple(int(part) for part in ver.split("."))
+    except ValueError:
+        return None
+
+def version_less(installed: str, required: str) -> bool:
+    """
+    Сравнить версии: installed < required.
+    Обычные версии сравниваются как кортежи, packaging импортируется только для нестандартных.
+    """
+    a, b = version_tuple(installed), version_tuple(required)
+    if a is not None and b is not None:
+        width = max(len(a), len(b))
+        return a + (0,) * (width - len(a)) < b + (0,) * (width - len(b))
+    from packaging.version import parse as parse_version
+    return parse_version(installed) < parse_version(required)
+
 def import_or_update(module_name, pypi_name=None, min_version=None, force_check=False):
     """
     Импортирует модуль, при необходимости устанавливает или обновляет его до актуальной версии с PyPI.
     """
     pypi_name = pypi_name or module_name
 
-    if not CHECK_VER and not force_check:
+    # В дочерних процессах пула модули уже проверены основным процессом,
+    # а в собранном exe (PyInstaller и т.п.) обновлять через pip нечего
+    skip_check = multiprocessing.parent_process() is not None or getattr(sys, "frozen", False)
+    if (not CHECK_VER and not force_check) or skip_check:
         try:
             return importlib.import_module(module_name)
         except ImportError:
@@ -61,18 +146,16 @@ def import_or_update(module_name, pypi_name=None, min_version=None, force_check=
         module = importlib.import_module(module_name)
 
         try:
-            resp = requests.get(f"https://pypi.org/pypi/{pypi_name}/json", timeout=5)
-            if resp.ok:
-                latest = resp.json()["info"]["version"]
-                try:
-                    installed = get_version(pypi_name)
-                except PackageNotFoundError:
-                    installed = getattr(module, "__version__", None)
-
-                if installed and parse_version(installed) < parse_version(latest):
-                    print(f"\n[!] Доступна новая версия {pypi_name}: {installed} → {latest}. Обновляю...")
-                    subprocess.check_call([sys.executable, "-m", "pip", "install", "--upgrade", pypi_name])
-                    module = importlib.reload(module)
+            latest = get_latest_version(pypi_name)
+            try:
+                installed = get_version(pypi_name)
+            except PackageNotFoundError:
+                installed = getattr(module, "__version__", None)
+
+            if installed and version_less(installed, latest):
+                print(f"\n[!] Доступна новая версия {pypi_name}: {installed} → {latest}. Обновляю...")
+                subprocess.check_call([sys.executable, "-m", "pip", "install", "--upgrade", pypi_name])
+                module = importlib.reload(module)
             print(" - OK")
         except Exception as e:
             print(f"[!] Не удалось проверить {pypi_name}: {e}")
@@ -82,7 +165,7 @@ def import_or_update(module_name, pypi_name=None, min_version=None, force_check=
                 installed = get_version(pypi_name)
             except PackageNotFoundError:
                 installed = getattr(module, "__version__", None)
-            if installed and parse_version(installed) < parse_version(min_version):
+            if installed and version_less(installed, min_version):
                 print(f"\n[!] Требуется версия {min_version} для {pypi_name}, обновляю...")
                 subprocess.check_call([sys.executable, "-m", "pip", "install", f"{pypi_name}>={min_version}"])
                 module = importlib.reload(module)
@@ -98,17 +181,30 @@ def import_or_update(module_name, pypi_name=None, min_version=None, force_check=
 PIL = import_or_update("PIL", "pillow", force_check=True)
 from PIL import Image, ImageDraw, ImageFont
 
+def ffmpeg_threads_args() -> list[str]:
+    """Аргументы ограничения потоков для ffmpeg/ffprobe (пустой список, если ограничения нет)."""
+    return ["-threads", str(FFMPEG_THREADS)] if FFMPEG_THREADS else []
+
+def ffmpeg_filter_threads_args() -> list[str]:
+    """Глобальные аргументы ffmpeg, ограничивающие потоки фильтров (-vf и -filter_complex)."""
+    if not FFMPEG_THREADS:
+        return []
+    return ["-filter_threads", str(FFMPEG_THREADS), "-filter_complex_threads", str(FFMPEG_THREADS)]
+
 def run_ffprobe(video_path: Path) -> tuple[int | None, int | None, float | None]:
     """Получить метаданные видео через ffprobe."""
-    cmd_stream = [
-        "ffprobe", "-v", "error",
+    # Длительность берём из видеопотока, а если её нет (у MKV/WebM часто N/A) —
+    # из контейнера; оба значения запрашиваются одним вызовом
+    cmd = [
+        "ffprobe", "-v", "error", *ffmpeg_threads_args(),
         "-select_streams", "v:0",
-        "-show_entries", "stream=width,height,duration",
+        "-show_entries", "stream=width,height,duration:format=duration",
         "-of", "default=noprint_wrappers=1:nokey=1",
         str(video_path)
     ]
     try:
-        out = subprocess.check_output(cmd_stream, stderr=subprocess.DEVNULL).decode().strip().split("\n")
+        # int()/float() принимают bytes напрямую, поэтому вывод не декодируем
+        out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL).splitlines()
     except subprocess.CalledProcessError as e:
         print(f"[!] ffprobe не удалось выполнить для {video_path}: {e}")
         return None, None, None
@@ -120,24 +216,13 @@ def run_ffprobe(video_path: Path) -> tuple[int | None, int | None, float | None]
             height = int(out[1])
         except ValueError:
             pass
-        try:
-            dur = float(out[2])
-        except ValueError:
-            dur = None
-
-    # Если длительность не получена — пробуем через формат
-    if not dur:
-        cmd_fmt = [
-            "ffprobe", "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            str(video_path)
-        ]
-        try:
-            out2 = subprocess.check_output(cmd_fmt, stderr=subprocess.DEVNULL).decode().strip()
-            dur = float(out2)
-        except Exception:
-            dur = None
+        for field in out[2:4]:
+            try:
+                dur = float(field)
+            except ValueError:
+                continue
+            if dur:
+                break
 
     return width, height, dur
 
@@ -148,26 +233,184 @@ def format_size(bytes_size: float) -> str:
         bytes_size /= 1024
     return f"{bytes_size:.1f} PB"
 
-def resolve_output_path(base_path: Path) -> Path | None:
+def resolve_output_path(base_path: Path, taken: set[Path] = frozenset()) -> Path | None:
     """
     Возвращает итоговый путь для скринлиста с учётом настройки OVERWRITE.
     base_path: ожидаемое имя файла (например video.jpg)
+    taken: пути, уже назначенные другим видео в этом запуске (считаются занятыми)
     """
     if OVERWRITE == 1:
-        return base_path
+        # Имя занято другим видео этого запуска (a.mp4 и a.mkv) — берём наименьший свободный
+        # в этом запуске индекс; существующий файл с таким именем перезаписывается, как и основной
+        candidate = base_path
+        idx = 1
+        while candidate in taken:
+            candidate = base_path.with_stem(f"{base_path.stem}_{idx}")
+            idx += 1
+        return candidate
     elif OVERWRITE == -1:
-        if base_path.exists():
+        if base_path.exists() or base_path in taken:
             print(f"[!] Скринлист {base_path.name} уже существует, пропускаю.")
             return None
         return base_path
     else:  # OVERWRITE == 0
-        candidate = base_path
-        idx = 1
-        while candidate.exists():
-            candidate = candidate.with_stem(f"{base_path.stem}_{idx}")
+        if not base_path.exists() and base_path not in taken:
+            return base_path
+        # Один проход по папке вместо проверки _1, _2, ... по очереди: берём максимальный индекс + 1.
+        # Файлы вида stem_2019.jpg, у которых есть своё видео stem_2019.mp4, — чужие скринлисты, их не считаем
+        stem, suffix = base_path.stem, base_path.suffix
+        pattern = re.compile(rf"{re.escape(stem)}_(\d+){re.escape(suffix)}", re.IGNORECASE)
+        names = []
+        video_stems = set()
+        with os.scandir(base_path.parent) as entries:
+            for entry in entries:
+                entry_stem, entry_ext = os.path.splitext(entry.name)
+                if entry_ext.lower() in VIDEO_EXTS:
+                    video_stems.add(entry_stem.lower())
+                else:
+                    names.append(entry.name)
+        names += [p.name for p in taken if p.parent == base_path.parent]
+        idx = max(
+            (int(m.group(1)) for name in names
+             if (m := pattern.fullmatch(name)) and os.path.splitext(name)[0].lower() not in video_stems),
+            default=0
+        ) + 1
+        candidate = base_path.with_stem(f"{stem}_{idx}")
+        while candidate.exists() or candidate in taken:
             idx += 1
+            candidate = base_path.with_stem(f"{stem}_{idx}")
         return candidate
 
+_FONT = None
+
+def get_font():
+    """Шрифт для шапки; загружается один раз на процесс."""
+    global _FONT
+    if _FONT is None:
+        try:
+            _FONT = ImageFont.truetype("arial.ttf", FONT_SIZE)
+        except OSError:
+            _FONT = ImageFont.load_default()
+    return _FONT
+
+def iter_ffmpeg_frames(cmd: list[str]) -> Iterator[bytes]:
+    """
+    Запустить ffmpeg, выводящий поток MJPEG в stdout, и отдавать JPEG-кадры
+    по мере их появления (разделение по маркерам SOI/EOI).
+    Пока вызывающий код обрабатывает кадр, ffmpeg продолжает готовить следующие.
+    Если ffmpeg не удалось запустить (например, слишком длинная командная строка), кадров не будет.
+    """
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=1 << 20)
+    except OSError as e:
+        print(f"[!] Не удалось запустить ffmpeg: {e}")
+        return
+    buf = bytearray()
+    try:
+        while chunk := proc.stdout.read1(1 << 16):
+            buf += chunk
+            while (start := buf.find(b"\xff\xd8")) != -1:
+                end = buf.find(b"\xff\xd9", start + 2)
+                if end == -1:
+                    break
+                yield bytes(buf[start:end + 2])
+                del buf[:end + 2]
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+def extract_shots(video_path: Path, timestamps: list[float]) -> Iterator[tuple[int, float, bytes]]:
+    """
+    Извлечь кадры пачками по FFMPEG_BATCH_SIZE за один вызов ffmpeg на пачку,
+    чтобы командная строка не росла без ограничений на больших сетках.
+    Отдаёт (номер ячейки, метка времени, JPEG) по мере готовности кадров.
+    Если пачка вернула не все кадры, только её кадры извлекаются заново по одному
+    и перекрывают уже вставленные ячейки этой пачки.
+    """
+    for start in range(0, len(timestamps), FFMPEG_BATCH_SIZE):
+        chunk = timestamps[start:start + FFMPEG_BATCH_SIZE]
+        got = 0
+        for i, (ts, frame) in enumerate(zip(chunk, extract_frames_chunk(video_path, chunk))):
+            yield start + i, ts, frame
+            got += 1
+        if got == len(chunk):
+            continue
+        print(f"[!] Пакетное извлечение дало {got} из {len(chunk)} кадров для {video_path}, извлекаю по одному")
+        for i, ts in enumerate(chunk, start):
+            frame = extract_frame(video_path, ts)
+            if frame:
+                yield i, ts, frame
+            else:
+                print(f"[!] ffmpeg не удалось извлечь кадр {i} для {video_path}")
+
+def extract_frames_chunk(video_path: Path, timestamps: list[float]) -> Iterator[bytes]:
+    """
+    Извлечь кадры одним вызовом ffmpeg.
+    Каждая метка времени — отдельный вход с быстрым поиском (-ss перед -i)
+    до ближайшего ключевого кадра, декодируются только ключевые кадры.
+    Кадры склеиваются фильтром concat и отдаются в stdout потоком MJPEG.
+    """
+    cmd = ["ffmpeg", "-v", "error", *ffmpeg_filter_threads_args()]
+    for ts in timestamps:
+        cmd += [
+            "-ss", str(ts), "-t", "1", "-noaccurate_seek", "-skip_frame", "nokey",
+            *ffmpeg_threads_args(), "-i", str(video_path)
+        ]
+    # setpts=0 у каждого кадра и setpts=N после concat дают кадрам разные метки времени 0, 1, 2...,
+    # иначе после concat они совпадают и -vsync vfr их отбрасывает
+    chains = [f"[{i}:v:0]trim=end_frame=1,setpts=0,scale={THUMB_WIDTH}:-2[v{i}]" for i in range(len(timestamps))]
+    labels = "".join(f"[v{i}]" for i in range(len(timestamps)))
+    graph = ";".join(chains) + f";{labels}concat=n={len(timestamps)}:v=1:a=0,settb=1,setpts=N[out]"
+    cmd += [
+        "-filter_complex", graph, "-map", "[out]",
+        "-vsync", "vfr", "-frames:v", str(len(timestamps)), "-q:v", "2",
+        "-f", "image2pipe", "-vcodec", "mjpeg", "pipe:1"
+    ]
+    return iter_ffmpeg_frames(cmd)
+
+def extract_frame(video_path: Path, ts: float) -> bytes | None:
+    """
+    Извлечь один кадр отдельным вызовом ffmpeg (запасной путь).
+    Берётся ключевой кадр перед ts, но без -skip_frame, чтобы путь работал
+    и для файлов, где декодер не помечает ключевые кадры.
+    """
+    cmd = [
+        "ffmpeg", *ffmpeg_filter_threads_args(),
+        "-ss", str(ts), "-noaccurate_seek", *ffmpeg_threads_args(), "-i", str(video_path),
+        "-vf", f"scale={THUMB_WIDTH}:-2", "-vsync", "vfr", "-frames:v", "1", "-q:v", "2",
+        "-f", "image2pipe", "-vcodec", "mjpeg", "pipe:1"
+    ]
+    return next(iter_ffmpeg_frames(cmd), None)
+
+def compose_sheet(shots: Iterable[tuple[int, float, bytes]]) -> Image.Image | None:
+    """
+    Разложить кадры по ячейкам сетки листа по мере их поступления.
+    Повторный кадр для той же ячейки перекрывает прежний вместе с меткой времени.
+    Возвращает лист (None, если кадров нет).
+    """
+    sheet = draw = None
+    thumb_h = 0
+    text_color = get_contrast_text_color(BG_COLOR)
+    # Каждый кадр декодируется прямо перед вставкой, без промежуточной копии convert()
+    for idx, ts, frame in shots:
+        with Image.open(io.BytesIO(frame)) as img:
+            if sheet is None:
+                # Кадры приходят из ffmpeg уже уменьшенными до THUMB_WIDTH,
+                # размер листа считаем по первому из них
+                thumb_h = img.height
+                total_w = THUMBS_PER_ROW * THUMB_WIDTH + (THUMBS_PER_ROW+1) * PADDING
+                total_h = HEADER_HEIGHT + THUMBS_PER_COL * thumb_h + (THUMBS_PER_COL+1) * PADDING
+                sheet = Image.new("RGB", (total_w, total_h), BG_COLOR)
+                draw = ImageDraw.Draw(sheet)
+            row, col = divmod(idx, THUMBS_PER_ROW)
+            x = PADDING + col * (THUMB_WIDTH + PADDING)
+            y = HEADER_HEIGHT + PADDING + row * (thumb_h + PADDING)
+            sheet.paste(img, (x, y))
+        draw.text((x + 5, y + 5), str(timedelta(seconds=int(ts))), fill=text_color)
+    return sheet
+
 def create_thumbnail(video_path: Path, output_path: Path) -> None:
     """Создать скринлист для видео."""
     width, height, duration = run_ffprobe(video_path)
@@ -177,63 +420,23 @@ def create_thumbnail(video_path: Path, output_path: Path) -> None:
 
     total_shots = THUMBS_PER_ROW * THUMBS_PER_COL
     step = duration / (total_shots + 1)
-    timestamps = [step * (i+1) for i in range(total_shots)]
-
-    temp_dir = Path("_thumbs_temp")
-    temp_dir.mkdir(exist_ok=True)
-
-    images = []
-    for i, ts in enumerate(timestamps):
-        ts_str = str(timedelta(seconds=int(ts)))
-        img_file = temp_dir / f"shot_{i:03d}.jpg"
-        cmd = [
-            "ffmpeg", "-ss", str(ts), "-i", str(video_path),
-            "-frames:v", "1", "-q:v", "2", "-y", str(img_file)
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if result.returncode != 0:
-            print(f"[!] ffmpeg не удалось извлечь кадр {i} для {video_path}")
-            continue
-        if img_file.exists():
-            with Image.open(img_file) as img:
-                img = img.convert("RGB")
-                img = img.resize((THUMB_WIDTH, int(THUMB_WIDTH * img.height / img.width)))
-                draw = ImageDraw.Draw(img)
-                text_color = get_contrast_text_color(BG_COLOR)
-                draw.text((5, 5), ts_str, fill=text_color)
-                images.append(img)
-
-    if not images:
-        print(f"[!] Не удалось извлечь кадры из {video_path}")
-        return
+    timestamps = sorted(step * (i+1) for i in range(total_shots))
 
-    thumb_h = images[0].height
-    total_w = THUMBS_PER_ROW * THUMB_WIDTH + (THUMBS_PER_ROW+1) * PADDING
-    total_h = HEADER_HEIGHT + THUMBS_PER_COL * thumb_h + (THUMBS_PER_COL+1) * PADDING
+    # Кадры вставляются в лист по мере того, как ffmpeg их отдаёт
+    sheet = compose_sheet(extract_shots(video_path, timestamps))
 
-    sheet = Image.new("RGB", (total_w, total_h), BG_COLOR)
-    draw = ImageDraw.Draw(sheet)
+    if sheet is None:
+        print(f"[!] Не удалось извлечь кадры из {video_path}")
+        return
 
     # --- Шапка ---
     stat = video_path.stat()
     header_text = f"{video_path.name} | {width}x{height} | {format_size(stat.st_size)} | {str(timedelta(seconds=int(duration)))}"
-    try:
-        font = ImageFont.truetype("arial.ttf", FONT_SIZE)
-    except:
-        font = ImageFont.load_default()
+    font = get_font()
     text_color = get_contrast_text_color(BG_COLOR)
-    draw.text((PADDING, PADDING), header_text, fill=text_color, font=font)
-
-    # --- Вставка миниатюр ---
-    for idx, img in enumerate(images):
-        row, col = divmod(idx, THUMBS_PER_ROW)
-        x = PADDING + col * (THUMB_WIDTH + PADDING)
-        y = HEADER_HEIGHT + PADDING + row * (thumb_h + PADDING)
-        sheet.paste(img, (x, y))
+    ImageDraw.Draw(sheet).text((PADDING, PADDING), header_text, fill=text_color, font=font)
 
     sheet.save(output_path, "JPEG", quality=90)
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
 
 def get_contrast_text_color(bg_color: str) -> str:
     # Простое правило: для светлого фона — черный текст, для темного — белый
@@ -242,8 +445,45 @@ def get_contrast_text_color(bg_color: str) -> str:
         return "black"
     return "white"
 
+def iter_video_files(folder: Path, recursive: bool):
+    """
+    Перебирает видеофайлы в папке (и подпапках, если recursive) через os.scandir.
+    Расширение проверяется по имени до обращения к атрибутам файла.
+    """
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if os.path.splitext(entry.name)[1].lower() in VIDEO_EXTS and entry.is_file():
+                        yield Path(entry.path)
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+        except OSError as e:
+            print(f"[!] Не удалось прочитать папку {current}: {e}")
+
+def init_worker(thumbs_per_row: int, thumbs_per_col: int, thumb_width: int, bg_color: str) -> None:
+    """Передать настройки из командной строки в процесс пула."""
+    global THUMBS_PER_ROW, THUMBS_PER_COL, THUMB_WIDTH, BG_COLOR, FFMPEG_THREADS
+    THUMBS_PER_ROW = thumbs_per_row
+    THUMBS_PER_COL = thumbs_per_col
+    THUMB_WIDTH = thumb_width
+    BG_COLOR = bg_color
+    # Параллелизмом управляет пул, каждый ffmpeg работает в один поток
+    FFMPEG_THREADS = 1
+
+def create_thumbnail_worker(pair: tuple[Path, Path]) -> None:
+    """Обработать одно видео из списка (в основном процессе или в процессе пула)."""
+    file, resolved = pair
+    print(f"[+] Обрабатываю {file} → {resolved.name}", flush=True)
+    try:
+        create_thumbnail(file, resolved)
+    except Exception as e:
+        print(f"[!] Ошибка при обработке {file}: {e}", flush=True)
+
 def main():
-    global THUMBS_PER_ROW, THUMBS_PER_COL, THUMB_WIDTH, OVERWRITE, BG_COLOR
+    global THUMBS_PER_ROW, THUMBS_PER_COL, THUMB_WIDTH, OVERWRITE, BG_COLOR, JOBS
 
     args = sys.argv[1:]
     recursive = False
@@ -280,6 +520,12 @@ def main():
                 skip_next = True
             except ValueError:
                 print("[!] Некорректное значение для -width")
+        elif arg == "-j" and i + 1 < len(args):
+            try:
+                JOBS = max(1, int(args[i + 1]))
+                skip_next = True
+            except ValueError:
+                print("[!] Некорректное значение для -j")
         elif arg == "-bg" and i + 1 < len(args):
             color = args[i + 1].lower()
             if color in allowed_colors:
@@ -317,18 +563,29 @@ def main():
     else:
         # Обработка всех файлов в папке (и подпапках, если recursive)
         folder = Path(".")
-        if recursive:
-            files = folder.rglob("*")
+        pairs = []
+        taken = set()
+        for file in iter_video_files(folder, recursive):
+            out_file = file.with_suffix(".jpg")
+            resolved = resolve_output_path(out_file, taken)
+            if not resolved:
+                continue  # пропуск по правилу OVERWRITE
+            taken.add(resolved)
+            pairs.append((file.relative_to(folder), resolved))
+
+        workers = min(JOBS, len(pairs))
+        if sys.platform == "win32":
+            # ProcessPoolExecutor под Windows не поддерживает больше 61 процесса
+            workers = min(workers, 61)
+        if workers > 1:
+            initargs = (THUMBS_PER_ROW, THUMBS_PER_COL, THUMB_WIDTH, BG_COLOR)
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as ex:
+                list(ex.map(create_thumbnail_worker, pairs))
         else:
-            files = folder.iterdir()
-        for file in files:
-            if file.is_file() and file.suffix.lower() in VIDEO_EXTS:
-                out_file = file.with_suffix(".jpg")
-                resolved = resolve_output_path(out_file)
-                if not resolved:
-                    continue  # пропуск по правилу OVERWRITE
-                print(f"[+] Обрабатываю {file.relative_to(folder)} → {resolved.name}")
-                create_thumbnail(file, resolved)
+            for pair in pairs:
+                create_thumbnail_worker(pair)
 
 if __name__ == "__main__":
+    # Нужно для процессов пула в собранном exe (PyInstaller) под Windows
+    multiprocessing.freeze_support()
     main()